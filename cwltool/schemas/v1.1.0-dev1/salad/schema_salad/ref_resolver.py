@@ -5,10 +5,7 @@ import hashlib
 import logging
 import collections
 import urlparse
-import re
-import copy
 import pprint
-from StringIO import StringIO
 
 from . import validate
 from .aslist import aslist
@@ -19,6 +16,8 @@ from cachecontrol.wrapper import CacheControl
 from cachecontrol.caches import FileCache
 import ruamel.yaml as yaml
 
+from ruamel.yaml.error import YAMLError
+
 try:
     from ruamel.yaml import CSafeLoader as SafeLoader
 except ImportError:
@@ -33,7 +32,76 @@ from typing import (Any, AnyStr, Callable, cast, Dict, List, Iterable, Tuple,
 
 _logger = logging.getLogger("salad")
 
+XSD_PREFIX = u"http://www.w3.org/2001/XMLSchema#"
+XSD_ANYURI = XSD_PREFIX + u"anyURI"
+RDFS_LITERAL = u"http://www.w3.org/2000/01/rdf-schema#Literal"
+
+_ABSOLUTE_URL_PREFIXES = (u"http://", u"https://", u"file://", u"urn:")
+_URL_CACHE_SIZE = 4096
+# On Python 2 an ASCII str and the equal unicode string share a hash, so
+# like urlparse's own cache the keys include the argument types to hand
+# back results of the right type.
+_split_cache = {}  # type: Dict[Tuple[unicode, type], urlparse.SplitResult]
+_urljoin_cache = {}  # type: Dict[Tuple[unicode, unicode, type, type], unicode]
+
+
+def _cached_split(url):  # type: (unicode) -> urlparse.SplitResult
+    key = (url, type(url))
+    try:
+        return _split_cache[key]
+    except KeyError:
+        if len(_split_cache) >= _URL_CACHE_SIZE:
+            _split_cache.clear()
+        split = _split_cache[key] = urlparse.urlsplit(url)
+        return split
+
+
+def _cached_urljoin(base, url):  # type: (unicode, unicode) -> unicode
+    key = (base, url, type(base), type(url))
+    try:
+        return _urljoin_cache[key]
+    except KeyError:
+        if len(_urljoin_cache) >= _URL_CACHE_SIZE:
+            _urljoin_cache.clear()
+        joined = _urljoin_cache[key] = urlparse.urljoin(base, url)
+        return joined
+
+
+_unicode_interned = {}  # type: Dict[unicode, unicode]
+
+
+def _intern(s):  # type: (Any) -> Any
+    # Builtin intern() only accepts byte strings on Python 2, so unicode
+    # strings are canonicalized through a module-level table.
+    if isinstance(s, str):
+        return intern(s)
+    if isinstance(s, unicode):
+        return _unicode_interned.setdefault(s, s)
+    return s
+
+
+_normalize_cache = {}  # type: Dict[Tuple[unicode, type], unicode]
+
+
+def _normalize_url(url):  # type: (unicode) -> unicode
+    key = (url, type(url))
+    try:
+        return _normalize_cache[key]
+    except KeyError:
+        if len(_normalize_cache) >= _URL_CACHE_SIZE:
+            _normalize_cache.clear()
+        norm = _normalize_cache[key] = _cached_split(url).geturl()
+        return norm
+
+
+# A validate_links stack frame.  ident is the node's own identifier, if it
+# has one, and unchecked is set under noLinkCheck fields.
+_LinkFrame = collections.namedtuple(
+    "_LinkFrame", "node docid children parent key ident unchecked")
+
+
 class NormDict(dict):
+    __slots__ = ("normalize",)
 
     def __init__(self, normalize=unicode):  # type: (type) -> None
         super(NormDict, self).__init__()
@@ -54,15 +122,14 @@ class NormDict(dict):
 
 def merge_properties(a, b):
     c = {}
-    for i in a:
-        if i not in b:
-            c[i] = a[i]
-    for i in b:
-        if i not in a:
-            c[i] = b[i]
-    for i in a:
+    for i, v in a.iteritems():
         if i in b:
-            c[i] = aslist(a[i]) + aslist(b[i])
+            c[i] = aslist(v) + aslist(b[i])
+        else:
+            c[i] = v
+    for i, v in b.iteritems():
+        if i not in a:
+            c[i] = v
 
     return c
 
@@ -81,11 +148,10 @@ class Loader(object):
     def __init__(self, ctx, schemagraph=None, foreign_properties=None,
                  idx=None, cache=None, session=None):
         # type: (Loader.ContextType, rdflib.Graph, Set[unicode], Dict[unicode, Union[List, Dict[unicode, Any], unicode]], Dict[unicode, Any], requests.sessions.Session) -> None
-        normalize = lambda url: urlparse.urlsplit(url).geturl()
         if idx is not None:
             self.idx = idx
         else:
-            self.idx = NormDict(normalize)
+            self.idx = NormDict(_normalize_url)
 
         self.ctx = {}  # type: Loader.ContextType
         if schemagraph is not None:
@@ -116,12 +182,16 @@ class Loader(object):
         self.identifiers = None  # type: Set[unicode]
         self.identity_links = None  # type: Set[unicode]
         self.standalone = None  # type: Set[unicode]
-        self.nolinkcheck = None  # type: Set[unicode]
+        self.nolinkcheck = None  # type: FrozenSet[unicode]
         self.vocab = {}  # type: Dict[unicode, unicode]
         self.rvocab = {}  # type: Dict[unicode, unicode]
         self.idmap = None  # type: Dict[unicode, Any]
         self.mapPredicate = None  # type: Dict[unicode, unicode]
         self.type_dsl_fields = None  # type: Set[unicode]
+        self._primary_identifier = None  # type: unicode
+        self._link_validated = None  # type: Dict[int, Any]
+        self._link_unchecked = None  # type: Dict[int, Any]
+        self._checked_files = None  # type: Dict[unicode, bool]
 
         self.add_context(ctx)
 
@@ -130,20 +200,27 @@ class Loader(object):
         if url in (u"@id", u"@type"):
             return url
 
-        if vocab_term and url in self.vocab:
-            return url
+        if vocab_term:
+            if url in self.vocab:
+                return url
+            if url in self.rvocab:
+                return self.rvocab[url]
 
         if self.vocab and u":" in url:
             prefix = url.split(u":")[0]
             if prefix in self.vocab:
                 url = self.vocab[prefix] + url[len(prefix) + 1:]
 
-        split = urlparse.urlsplit(url)
+        # Absolute URLs resolve to themselves, skip parsing them.
+        if url.startswith(_ABSOLUTE_URL_PREFIXES):
+            return self.rvocab.get(url, url) if vocab_term else url
+
+        split = _cached_split(url)
 
         if split.scheme or url.startswith(u"$(") or url.startswith(u"${"):
             pass
         elif scoped_id and not split.fragment:
-            splitbase = urlparse.urlsplit(base_url)
+            splitbase = _cached_split(base_url)
             frg = u""
             if splitbase.fragment:
                 frg = splitbase.fragment + u"/" + split.path
@@ -155,7 +232,7 @@ class Loader(object):
         elif scoped_ref is not None and not split.fragment:
             pass
         else:
-            url = urlparse.urljoin(base_url, url)
+            url = _cached_urljoin(base_url, url)
 
         if vocab_term and url in self.rvocab:
             return self.rvocab[url]
@@ -164,11 +241,9 @@ class Loader(object):
 
     def _add_properties(self, s):  # type: (unicode) -> None
         for _, _, rng in self.graph.triples((s, RDFS.range, None)):
-            literal = ((unicode(rng).startswith(
-                u"http://www.w3.org/2001/XMLSchema#") and
-                not unicode(rng) == u"http://www.w3.org/2001/XMLSchema#anyURI")
-                or unicode(rng) ==
-                u"http://www.w3.org/2000/01/rdf-schema#Literal")
+            rng = unicode(rng)
+            literal = ((rng.startswith(XSD_PREFIX) and rng != XSD_ANYURI)
+                       or rng == RDFS_LITERAL)
             if not literal:
                 self.url_fields.add(unicode(s))
         self.foreign_properties.add(unicode(s))
@@ -180,7 +255,7 @@ class Loader(object):
         # type: (Union[List[unicode], unicode], unicode) -> None
         for sch in aslist(ns):
             fetchurl = urlparse.urljoin(base_url, sch)
-            if fetchurl not in self.cache:
+            if not isinstance(self.cache.get(fetchurl), rdflib.graph.Graph):
                 _logger.info("Getting external schema %s", fetchurl)
                 content = self.fetch_text(fetchurl)
                 self.cache[fetchurl] = rdflib.graph.Graph()
@@ -196,17 +271,17 @@ class Loader(object):
                     except BadSyntax:
                         pass
 
-        for s, _, _ in self.graph.triples((None, RDF.type, RDF.Property)):
-            self._add_properties(s)
-        for s, _, o in self.graph.triples((None, RDFS.subPropertyOf, None)):
-            self._add_properties(s)
-            self._add_properties(o)
-        for s, _, _ in self.graph.triples((None, RDFS.range, None)):
-            self._add_properties(s)
-        for s, _, _ in self.graph.triples((None, RDF.type, OWL.ObjectProperty)):
-            self._add_properties(s)
-
-        for s, _, _ in self.graph.triples((None, None, None)):
+        # Single pass over the graph instead of one triples() query per
+        # property pattern.
+        for s, p, o in self.graph:
+            if p == RDF.type:
+                if o == RDF.Property or o == OWL.ObjectProperty:
+                    self._add_properties(s)
+            elif p == RDFS.subPropertyOf:
+                self._add_properties(s)
+                self._add_properties(o)
+            elif p == RDFS.range:
+                self._add_properties(s)
             self.idx[unicode(s)] = None
 
     def add_context(self, newcontext, baseuri=""):
@@ -232,7 +307,7 @@ class Loader(object):
 
         _logger.debug("ctx is %s", self.ctx)
 
-        for key, value in self.ctx.items():
+        for key, value in self.ctx.iteritems():
             if value == u"@id":
                 self.identifiers.add(key)
                 self.identity_links.add(key)
@@ -263,9 +338,36 @@ class Loader(object):
             elif isinstance(value, basestring):
                 self.vocab[key] = value
 
-        for k, v in self.vocab.items():
+        for k, v in self.vocab.iteritems():
             self.rvocab[self.expand_url(v, u"", scoped_id=False)] = k
 
+        # Context terms are compared against the keys of every document
+        # node, share a single instance of each so those comparisons can
+        # succeed on identity.
+        self.url_fields = set(_intern(k) for k in self.url_fields)
+        self.vocab_fields = set(_intern(k) for k in self.vocab_fields)
+        self.identifiers = set(_intern(k) for k in self.identifiers)
+        self.identity_links = set(_intern(k) for k in self.identity_links)
+        self.nolinkcheck = frozenset(_intern(k) for k in self.nolinkcheck)
+        self.type_dsl_fields = set(_intern(k) for k in self.type_dsl_fields)
+        self.scoped_ref_fields = dict(
+            (_intern(k), v) for k, v in self.scoped_ref_fields.items())
+        self.idmap = dict(
+            (_intern(k), _intern(v)) for k, v in self.idmap.items())
+        self.mapPredicate = dict(
+            (_intern(k), _intern(v)) for k, v in self.mapPredicate.items())
+        self.vocab = dict(
+            (_intern(k), _intern(v)) for k, v in self.vocab.items())
+        self.rvocab = dict(
+            (_intern(k), _intern(v)) for k, v in self.rvocab.items())
+
+        # Nearly every context has exactly one identifier field ("id"),
+        # look it up directly instead of looping over self.identifiers.
+        if len(self.identifiers) == 1:
+            self._primary_identifier = next(iter(self.identifiers))
+        else:
+            self._primary_identifier = None
+
         _logger.debug("identifiers is %s", self.identifiers)
         _logger.debug("identity_links is %s", self.identity_links)
         _logger.debug("url_fields is %s", self.url_fields)
@@ -304,10 +406,13 @@ class Loader(object):
                 obj = None
             else:
                 ref = None
-                for identifier in self.identifiers:
-                    if identifier in obj:
-                        ref = obj[identifier]
-                        break
+                if self._primary_identifier is not None:
+                    ref = obj.get(self._primary_identifier)
+                else:
+                    for identifier in self.identifiers:
+                        if identifier in obj:
+                            ref = obj[identifier]
+                            break
                 if not ref:
                     raise ValueError(
                         u"Object `%s` does not have identifier field in %s" % (obj, self.identifiers))
@@ -343,7 +448,7 @@ class Loader(object):
 
         # Recursively expand urls and resolve directives
         if mixin:
-            doc = copy.deepcopy(doc)
+            doc = _copy_tree(doc)
             doc.update(mixin)
             del doc["$mixin"]
             url = None
@@ -383,8 +488,10 @@ class Loader(object):
                         and "$import" not in idmapFieldValue
                         and "$include" not in idmapFieldValue):
                     ls = []
-                    for k in sorted(idmapFieldValue.keys()):
-                        val = idmapFieldValue[k]
+                    # Keep the key-sorted output order; plain dicts have no
+                    # meaningful order on Python 2.
+                    for k, val in sorted(idmapFieldValue.iteritems(),
+                                         key=lambda item: item[0]):
                         v = None  # type: Dict[unicode, Any]
                         if not isinstance(val, dict):
                             if idmapField in loader.mapPredicate:
@@ -399,22 +506,28 @@ class Loader(object):
                         ls.append(v)
                     document[idmapField] = ls
 
-    typeDSLregex = re.compile(ur"^([^[?]+)(\[\])?(\?)?$")
-
     def _type_dsl(self, t):
         # type: (Union[unicode, Dict, List]) -> Union[unicode, Dict[unicode, unicode], List[Union[unicode, Dict[unicode, unicode]]]]
         if not isinstance(t, (str, unicode)):
             return t
 
-        m = Loader.typeDSLregex.match(t)
-        if not m:
+        # Parse `name`, `name[]`, `name?` and `name[]?` with plain string
+        # operations rather than a regular expression.  A single newline
+        # may follow the suffix, as left by YAML block scalars.
+        body = t[:-1] if t.endswith(u"\n") else t
+        optional = body.endswith(u"?")
+        core = body[:-1] if optional else body
+        array = core.endswith(u"[]")
+        if not (optional or array):
+            core = t
+        first = core[:-2] if array else core
+        if not first or u"[" in first or u"?" in first:
             return t
-        first = m.group(1)
         second = third = None
-        if m.group(2):
+        if array:
             second = {u"type": u"array",
                  u"items": first}
-        if m.group(3):
+        if optional:
             third = [u"null", second or first]
         return third or second or first
 
@@ -424,79 +537,94 @@ class Loader(object):
             if d in document:
                 datum = document[d]
                 if isinstance(datum, (str, unicode)):
-                    document[d] = self._type_dsl(datum)
-                elif isinstance(datum, list):
-                    document[d] = [self._type_dsl(t) for t in datum]
-                datum2 = document[d]
-                if isinstance(datum2, list):
-                    document[d] = flatten(datum2)
-                    seen = []  # type: List[unicode]
-                    uniq = []
-                    for item in document[d]:
-                        if item not in seen:
+                    datum = self._type_dsl(datum)
+                    if not isinstance(datum, list):
+                        document[d] = datum
+                        continue
+                elif not isinstance(datum, list):
+                    continue
+                # Expand, flatten and deduplicate in a single pass.  Type
+                # names go through a set; the few other items may be
+                # unhashable, so they are compared against each other.
+                seen = set()  # type: Set[unicode]
+                others = []  # type: List[Any]
+                uniq = []
+                for t in datum:
+                    t = self._type_dsl(t)
+                    for item in (flatten(t) if isinstance(t, (list, tuple))
+                                 else (t,)):
+                        if isinstance(item, basestring):
+                            if item not in seen:
+                                uniq.append(item)
+                                seen.add(item)
+                        elif item not in others:
                             uniq.append(item)
-                            seen.append(item)
-                    document[d] = uniq
+                            others.append(item)
+                document[d] = uniq
 
     def _resolve_identifier(self, document, loader, base_url):
         # type: (Dict[unicode, unicode], Loader, unicode) -> unicode
         # Expand identifier field (usually 'id') to resolve scope
         for identifer in loader.identifiers:
             if identifer in document:
-                if isinstance(document[identifer], basestring):
-                    document[identifer] = loader.expand_url(
-                        document[identifer], base_url, scoped_id=True)
-                    if (document[identifer] not in loader.idx
-                            or isinstance(
-                                loader.idx[document[identifer]], basestring)):
-                        loader.idx[document[identifer]] = document
-                    base_url = document[identifer]
+                ident = document[identifer]
+                if isinstance(ident, basestring):
+                    ident = loader.expand_url(ident, base_url, scoped_id=True)
+                    document[identifer] = ident
+                    if (ident not in loader.idx
+                            or isinstance(loader.idx[ident], basestring)):
+                        loader.idx[ident] = document
+                    base_url = ident
                 else:
                     raise validate.ValidationException(
-                        "identifier field '%s' must be a string"
-                        % (document[identifer]))
+                        "identifier field '%s' must be a string" % (ident))
         return base_url
 
     def _resolve_identity(self, document, loader, base_url):
         # type: (Dict[unicode, List[unicode]], Loader, unicode) -> None
         # Resolve scope for identity fields (fields where the value is the
         # identity of a standalone node, such as enum symbols)
+        expand = loader.expand_url
+        idx = loader.idx
         for identifer in loader.identity_links:
-            if identifer in document and isinstance(document[identifer], list):
-                for n, v in enumerate(document[identifer]):
-                    if isinstance(document[identifer][n], basestring):
-                        document[identifer][n] = loader.expand_url(
-                            document[identifer][n], base_url, scoped_id=True)
-                        if document[identifer][n] not in loader.idx:
-                            loader.idx[document[identifer][
-                                n]] = document[identifer][n]
+            links = document.get(identifer)
+            if isinstance(links, list):
+                for n, v in enumerate(links):
+                    if isinstance(v, basestring):
+                        v = links[n] = expand(v, base_url, scoped_id=True)
+                        if v not in idx:
+                            idx[v] = v
 
     def _normalize_fields(self, document, loader):
         # type: (Dict[unicode, unicode], Loader) -> None
         # Normalize fields which are prefixed or full URIn to vocabulary terms
+        # Collect renames first, the document can't change size while it
+        # is being iterated.
+        renames = []  # type: List[Tuple[unicode, unicode]]
         for d in document:
             d2 = loader.expand_url(d, u"", scoped_id=False, vocab_term=True)
-            if d != d2:
-                document[d2] = document[d]
-                del document[d]
+            if d is not d2 and d != d2:
+                renames.append((d, d2))
+        for d, d2 in renames:
+            document[_intern(d2)] = document.pop(d)
 
     def _resolve_uris(self, document, loader, base_url):
         # type: (Dict[unicode, Union[unicode, List[unicode]]], Loader, unicode) -> None
         # Resolve remaining URLs based on document base
+        expand = loader.expand_url
         for d in loader.url_fields:
             if d in document:
                 datum = document[d]
+                vocab_term = d in loader.vocab_fields
+                scoped_ref = self.scoped_ref_fields.get(d)
                 if isinstance(datum, (str, unicode)):
-                    document[d] = loader.expand_url(
+                    document[d] = expand(
                         datum, base_url, scoped_id=False,
-                        vocab_term=(d in loader.vocab_fields),
-                        scoped_ref=self.scoped_ref_fields.get(d))
+                        vocab_term=vocab_term, scoped_ref=scoped_ref)
                 elif isinstance(datum, list):
                     document[d] = [
-                        loader.expand_url(
-                            url, base_url, scoped_id=False,
-                            vocab_term=(d in loader.vocab_fields),
-                            scoped_ref=self.scoped_ref_fields.get(d))
+                        expand(url, base_url, scoped_id=False,
+                               vocab_term=vocab_term, scoped_ref=scoped_ref)
                         if isinstance(url, (str, unicode))
                         else url for url in datum]
 
@@ -567,9 +695,13 @@ class Loader(object):
             self._resolve_uris(document, loader, base_url)
 
             try:
-                for key, val in document.items():
-                    document[key], _ = loader.resolve_all(
-                        val, base_url, file_base=file_base, checklinks=False)
+                for key in tuple(document):
+                    val = document[key]
+                    # Scalars resolve to themselves, don't recurse on them.
+                    if isinstance(val, (dict, list)):
+                        document[key], _ = loader.resolve_all(
+                            val, base_url, file_base=file_base,
+                            checklinks=False)
             except validate.ValidationException as v:
                 _logger.warn("loader is %s", id(loader), exc_info=True)
                 raise validate.ValidationException("(%s) (%s) Validation error in field %s:\n%s" % (
@@ -580,7 +712,10 @@ class Loader(object):
             try:
                 while i < len(document):
                     val = document[i]
-                    if isinstance(val, dict) and (u"$import" in val or u"$mixin" in val):
+                    if not isinstance(val, (dict, list)):
+                        # Scalars resolve to themselves.
+                        i += 1
+                    elif isinstance(val, dict) and (u"$import" in val or u"$mixin" in val):
                         l, _ = loader.resolve_ref(val, base_url=file_base, checklinks=False)
                         if isinstance(l, list):  # never true?
                             del document[i]
@@ -625,33 +760,34 @@ class Loader(object):
                 resp.raise_for_status()
             except Exception as e:
                 raise RuntimeError(url, e)
-            return resp.text
+            text = resp.text
         elif scheme == 'file':
             try:
                 with open(path) as fp:
                     read = fp.read()
-                if hasattr(read, "decode"):
-                    return read.decode("utf-8")
-                else:
-                    return read
             except (OSError, IOError) as e:
                 raise RuntimeError('Error reading %s %s' % (url, e))
+            if hasattr(read, "decode"):
+                text = read.decode("utf-8")
+            else:
+                text = read
         else:
             raise ValueError('Unsupported scheme in url: %s' % url)
 
+        self.cache[url] = text
+        return text
+
     def fetch(self, url, inject_ids=True):  # type: (unicode, bool) -> Any
         if url in self.idx:
             return self.idx[url]
+        text = self.fetch_text(url)
         try:
-            text = self.fetch_text(url)
-            if isinstance(text, bytes):
-                textIO = StringIO(text.decode('utf-8'))
-            else:
-                textIO = StringIO(text)
-            textIO.name = url  # type: ignore
-            result = yaml.load(textIO, Loader=SafeLoader)
-        except yaml.parser.ParserError as e:
-            raise validate.ValidationException("Syntax error %s" % (e))
+            # The YAML reader accepts both byte and unicode strings
+            # directly, no need to wrap them in a stream.
+            result = yaml.load(text, Loader=SafeLoader)
+        except YAMLError as e:
+            raise validate.ValidationException(
+                "Syntax error in %s: %s" % (url, e))
         if isinstance(result, dict) and inject_ids and self.identifiers:
             for identifier in self.identifiers:
                 if identifier not in result:
@@ -668,11 +804,25 @@ class Loader(object):
         else:
             return False
 
+    def _check_file_cached(self, fn):  # type: (unicode) -> bool
+        # During a validate_links walk, stat each linked file only once.
+        if self._checked_files is None:
+            return self.check_file(fn)
+        try:
+            return self._checked_files[fn]
+        except KeyError:
+            exists = self._checked_files[fn] = self.check_file(fn)
+            return exists
+
     FieldType = TypeVar('FieldType', unicode, List[unicode], Dict[unicode, Any])
 
     def validate_scoped(self, field, link, docid):
         # type: (unicode, unicode, unicode) -> unicode
-        split = urlparse.urlsplit(docid)
+        split = _cached_split(docid)
+        # Only the fragment changes between candidates, so assemble the
+        # rest of the URL once.
+        prefix = urlparse.urlunsplit((
+            split.scheme, split.netloc, split.path, split.query, u""))
         sp = split.fragment.split(u"/")
         n = self.scoped_ref_fields[field]
         while n > 0 and len(sp) > 0:
@@ -681,9 +831,8 @@ class Loader(object):
         tried = []
         while True:
             sp.append(link)
-            url = urlparse.urlunsplit((
-                split.scheme, split.netloc, split.path, split.query,
-                u"/".join(sp)))
+            frg = u"/".join(sp)
+            url = prefix + u"#" + frg if frg else prefix
             tried.append(url)
             if url in self.idx:
                 return url
@@ -694,36 +843,43 @@ class Loader(object):
         raise validate.ValidationException(
             "Field `%s` contains undefined reference to `%s`, tried %s" % (field, link, tried))
 
-    def validate_link(self, field, link, docid):
-        # type: (unicode, FieldType, unicode) -> FieldType
+    def validate_link(self, field, link, docid, descend=True):
+        # type: (unicode, FieldType, unicode, bool) -> FieldType
         if field in self.nolinkcheck:
             return link
         if isinstance(link, (str, unicode)):
+            # Vocabulary fields mostly hold vocabulary terms, so probe the
+            # plain vocabulary dicts before the index, whose lookups
+            # normalize the URL first.  Other link fields mostly point
+            # into the index and check it first.
             if field in self.vocab_fields:
-                if link not in self.vocab and link not in self.idx and link not in self.rvocab:
+                if link not in self.vocab and link not in self.rvocab and link not in self.idx:
                     if field in self.scoped_ref_fields:
                         return self.validate_scoped(field, link, docid)
-                    elif not self.check_file(link):
+                    elif not self._check_file_cached(link):
                         raise validate.ValidationException(
                             "Field `%s` contains undefined reference to `%s`" % (field, link))
             elif link not in self.idx and link not in self.rvocab:
                 if field in self.scoped_ref_fields:
                     return self.validate_scoped(field, link, docid)
-                elif not self.check_file(link):
+                elif not self._check_file_cached(link):
                     raise validate.ValidationException(
                         "Field `%s` contains undefined reference to `%s`" % (field, link))
         elif isinstance(link, list):
             errors = []
             for n, i in enumerate(link):
                 try:
-                    link[n] = self.validate_link(field, i, docid)
+                    checked = self.validate_link(field, i, docid, descend)
+                    if checked is not i:
+                        link[n] = checked
                 except validate.ValidationException as v:
                     errors.append(v)
             if errors:
                 raise validate.ValidationException(
-                    "\n".join([str(e) for e in errors]))
+                    "\n".join(str(e) for e in errors))
         elif isinstance(link, dict):
-            self.validate_links(link, docid)
+            if descend:
+                self.validate_links(link, docid)
         else:
             raise validate.ValidationException("Link must be a str, unicode, "
                                                "list, or a dict.")
@@ -731,6 +887,9 @@ class Loader(object):
 
     def getid(self, d):  # type: (Any) -> unicode
         if isinstance(d, dict):
+            if self._primary_identifier is not None:
+                i = d.get(self._primary_identifier)
+                return i if isinstance(i, (str, unicode)) else None
             for i in self.identifiers:
                 if i in d:
                     if isinstance(d[i], (str, unicode)):
@@ -739,58 +898,154 @@ class Loader(object):
 
     def validate_links(self, document, base_url):
         # type: (DocumentType, unicode) -> DocumentType
-        docid = self.getid(document)
-        if not docid:
-            docid = base_url
-
-        errors = []
-        iterator = None  # type: Any
-        if isinstance(document, list):
-            iterator = enumerate(document)
-        elif isinstance(document, dict):
-            try:
-                for d in self.url_fields:
-                    if d in document and d not in self.identity_links:
-                        document[d] = self.validate_link(d, document[d], docid)
-            except validate.ValidationException as v:
-                errors.append(v)
-            if hasattr(document, "iteritems"):
-                iterator = document.iteritems()
+        if not isinstance(document, (list, dict)):
+            return document
+        outermost = self._link_validated is None
+        if outermost:
+            self._link_validated = {}
+            self._link_unchecked = {}
+            self._checked_files = {}
+        try:
+            return self._validate_links(document, base_url)
+        finally:
+            if outermost:
+                self._link_validated = None
+                self._link_unchecked = None
+                self._checked_files = None
+
+    def _validate_links(self, document, base_url):
+        # type: (DocumentType, unicode) -> DocumentType
+        # Walk the document depth first with an explicit stack instead of
+        # recursing, so deeply nested documents don't hit the recursion
+        # limit, keeping one _LinkFrame per open container.
+        # Containers are validated in place, so nothing is written back to
+        # the parent.  Errors are collected in one flat list of
+        # (frame, exception) pairs and only formatted if the walk fails.
+        nolinkcheck = self.nolinkcheck
+        errors = []  # type: List[Tuple[_LinkFrame, validate.ValidationException]]
+        stack = [self._link_frame(document, base_url, None, None, errors)]
+        while stack:
+            frame = stack[-1]
+            for key, val in frame.children:
+                # Scalars have nothing to validate, only descend into
+                # containers.  Subtrees under noLinkCheck fields are still
+                # walked so their scoped references get resolved, but
+                # their errors are discarded.
+                if isinstance(val, (list, dict)):
+                    stack.append(self._link_frame(
+                        val, frame.docid, frame, key, errors,
+                        frame.unchecked or key in nolinkcheck))
+                    break
             else:
-                iterator = document.items()
+                stack.pop()
+
+        if errors:
+            frame, exc = errors[0]
+            if len(errors) == 1 and frame.parent is None:
+                raise exc
+            raise validate.ValidationException(
+                self._format_link_errors(errors))
+        return document
+
+    def _link_frame(self, document, base_url, parent, key, errors,
+                    unchecked=False):
+        # type: (Any, unicode, _LinkFrame, Any, List, bool) -> _LinkFrame
+        # Build a validate_links stack frame for a list or dict, checking
+        # the node's own link fields up front.
+        # Shared subtrees and dict-valued links are reached more than once,
+        # only validate them the first time.  Unchecked visits discard
+        # their errors, so they are tracked separately and don't stand in
+        # for a later checked visit.  Holding on to the object keeps its
+        # id from being reused during the walk.
+        if id(document) in self._link_validated:
+            return _LinkFrame(document, base_url, iter(()), parent, key,
+                              None, unchecked)
+        if unchecked:
+            if id(document) in self._link_unchecked:
+                return _LinkFrame(document, base_url, iter(()), parent, key,
+                                  None, unchecked)
+            self._link_unchecked[id(document)] = document
         else:
-            return document
+            self._link_validated[id(document)] = document
 
-        for key, val in iterator:
+        if isinstance(document, dict):
+            ident = self.getid(document)
+            docid = ident or base_url
+            frame = _LinkFrame(document, docid, document.iteritems(), parent,
+                               key, ident, unchecked)
             try:
-                document[key] = self.validate_links(val, docid)
+                # Dicts inside link fields are children of this node, the
+                # walk reaches them without validate_link recursing.
+                for d in self.url_fields:
+                    if d in document and d not in self.identity_links:
+                        link = document[d]
+                        resolved = self.validate_link(
+                            d, link, docid, descend=False)
+                        if resolved is not link:
+                            document[d] = resolved
             except validate.ValidationException as v:
-                if key not in self.nolinkcheck:
-                    docid2 = self.getid(val)
-                    if docid2:
-                        errors.append(validate.ValidationException(
-                            "While checking object `%s`\n%s" % (docid2, validate.indent(str(v)))))
-                    else:
-                        if isinstance(key, basestring):
-                            errors.append(validate.ValidationException(
-                                "While checking field `%s`\n%s" % (key, validate.indent(str(v)))))
-                        else:
-                            errors.append(validate.ValidationException(
-                                "While checking position %s\n%s" % (key, validate.indent(str(v)))))
+                if not unchecked:
+                    errors.append((frame, v))
+            return frame
+
+        # Lists have neither identifiers nor link fields of their own.
+        return _LinkFrame(document, base_url, enumerate(document), parent,
+                          key, None, unchecked)
+
+    def _format_link_errors(self, errors):
+        # type: (List[Tuple[_LinkFrame, validate.ValidationException]]) -> str
+        # Render the flat error list as the nested report, writing a
+        # "While checking" header for each frame on an error's path the
+        # first time that frame is reached and indenting by depth.
+        lines = []  # type: List[str]
+        shown = []  # type: List[_LinkFrame]
+        for frame, v in errors:
+            path = []
+            while frame.parent is not None:
+                path.append(frame)
+                frame = frame.parent
+            path.reverse()
+            common = 0
+            while (common < len(shown) and common < len(path)
+                   and shown[common] is path[common]):
+                common += 1
+            for depth in range(common, len(path)):
+                step = path[depth]
+                if step.ident:
+                    header = "While checking object `%s`" % step.ident
+                elif isinstance(step.key, basestring):
+                    header = "While checking field `%s`" % step.key
+                else:
+                    header = "While checking position %s" % step.key
+                lines.append(_indent(header, depth))
+            lines.append(_indent(str(v), len(path)))
+            shown = path
+        return "\n".join(lines)
 
-        if errors:
-            if len(errors) > 1:
-                raise validate.ValidationException(
-                    "\n".join([str(e) for e in errors]))
-            else:
-                raise errors[0]
-        return document
+
+def _indent(text, depth):  # type: (str, int) -> str
+    # Same as applying validate.indent() `depth` times.
+    if not depth:
+        return text
+    pad = "  " * depth
+    return "\n".join(pad + l for l in text.splitlines())
+
+
+def _copy_tree(doc):  # type: (Any) -> Any
+    # Copy the dict/list structure of a loaded document.  Leaves are
+    # immutable scalars and can be shared, which makes this much cheaper
+    # than copy.deepcopy().
+    if isinstance(doc, dict):
+        return dict((k, _copy_tree(v)) for k, v in doc.iteritems())
+    if isinstance(doc, list):
+        return [_copy_tree(v) for v in doc]
+    return doc
 
 
 def _copy_dict_without_key(from_dict, filtered_key):
     # type: (Dict, Any) -> Dict
-    new_dict = {}
-    for key, value in from_dict.items():
-        if key != filtered_key:
-            new_dict[key] = value
+    # Shallow copy; dict() copies the hash table in C and always returns a
+    # plain dict, even for dict subclasses.
+    new_dict = dict(from_dict)
+    new_dict.pop(filtered_key, None)
     return new_dict
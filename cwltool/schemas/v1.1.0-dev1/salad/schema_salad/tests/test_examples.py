@@ -242,6 +242,15 @@ class TestSchemas(unittest.TestCase):
     def test_yaml_float_test(self):
         self.assertEqual(yaml.load("float-test: 2e-10")["float-test"], 2e-10)
 
+    def test_fetch_yaml_types(self):
+        # Documents must be typed exactly as ruamel.yaml types them.
+        text = u"float-test: 2e-10\nbool-test: yes\n"
+        ldr = schema_salad.ref_resolver.Loader({})
+        ldr.cache["file:///t/types.yml"] = text
+        doc = ldr.fetch("file:///t/types.yml", inject_ids=False)
+        self.assertEqual(doc["float-test"], 2e-10)
+        self.assertEqual(doc, yaml.load(text, Loader=SafeLoader))
+
     def test_typedsl_ref(self):
         ldr = schema_salad.ref_resolver.Loader({})
         ldr.add_context({
@@ -267,6 +276,26 @@ class TestSchemas(unittest.TestCase):
         self.assertEqual(
             {'type': ['null', {'items': 'File', 'type': 'array'}]}, ra)
 
+        ra, _ = ldr.resolve_all({"type": "File[]?\n"}, "")
+        self.assertEqual(
+            {'type': ['null', {'items': 'File', 'type': 'array'}]}, ra)
+
+        ra, _ = ldr.resolve_all({"type": ["File?", "null", "File[]", "File"]}, "")
+        self.assertEqual(
+            {'type': ['null', 'File', {'items': 'File', 'type': 'array'}]}, ra)
+
+        # Inline types may hold values that aren't JSON serializable.
+        rec = yaml.load("""
+type: record
+fields:
+  - name: day
+    type: string
+    default: 2017-01-01
+""", Loader=SafeLoader)
+        ra, _ = ldr.resolve_all(
+            {"type": ["null", rec, "null", rec]}, "", checklinks=False)
+        self.assertEqual({'type': ['null', rec]}, ra)
+
     def test_scoped_id(self):
         ldr = schema_salad.ref_resolver.Loader({})
         ctx = {
@@ -364,5 +393,79 @@ class TestSchemas(unittest.TestCase):
                 'one': 'two'}
         }], ra[0])
 
+    def test_validate_links_deep(self):
+        ldr = schema_salad.ref_resolver.Loader({"id": "@id"})
+        doc = {}
+        node = doc
+        for _ in range(5000):
+            node["a"] = [{}]
+            node = node["a"][0]
+        self.assertIs(doc, ldr.validate_links(doc, u""))
+
+    def test_validate_links_errors(self):
+        ldr = schema_salad.ref_resolver.Loader({
+            "id": "@id",
+            "link": {"@type": "@id"},
+            "skip": {"@type": "@id", "noLinkCheck": True}})
+        doc = {
+            "id": "http://example.com/#a",
+            "x": [{"link": "http://example.com/missing"},
+                  {"id": "http://example.com/#b",
+                   "link": "http://example.com/gone"}],
+            "skip": {"link": "http://example.com/nope"}}
+        with self.assertRaises(
+                schema_salad.validate.ValidationException) as cm:
+            ldr.validate_links(doc, u"")
+        self.assertEqual(
+            "While checking field `x`\n"
+            "  While checking position 0\n"
+            "    Field `link` contains undefined reference to "
+            "`http://example.com/missing`\n"
+            "  While checking object `http://example.com/#b`\n"
+            "    Field `link` contains undefined reference to "
+            "`http://example.com/gone`", str(cm.exception))
+
+    def test_validate_links_nolinkcheck_scoped(self):
+        ldr = schema_salad.ref_resolver.Loader({
+            "id": "@id",
+            "hints": {"@type": "@id", "noLinkCheck": True},
+            "type": {"@type": "@vocab", "refScope": 1}})
+        ldr.idx["file:///t/tool.cwl#Bar"] = {}
+        # Scoped references under noLinkCheck fields are still resolved,
+        # only their errors are ignored.
+        doc = {
+            "id": "file:///t/tool.cwl",
+            "hints": [{"id": "file:///t/tool.cwl#Foo",
+                       "fields": [{"id": "file:///t/tool.cwl#Foo/a",
+                                   "type": "Bar"},
+                                  {"id": "file:///t/tool.cwl#Foo/b",
+                                   "type": "Missing"}]}]}
+        ldr.validate_links(doc, u"")
+        fields = doc["hints"][0]["fields"]
+        self.assertEqual("file:///t/tool.cwl#Bar", fields[0]["type"])
+        self.assertEqual("Missing", fields[1]["type"])
+
+    def test_validate_links_shared(self):
+        ldr = schema_salad.ref_resolver.Loader({
+            "id": "@id",
+            "link": {"@type": "@id"},
+            "skip": {"@type": "@id", "noLinkCheck": True}})
+        # The shared subtree is reached under noLinkCheck first, the
+        # checked visit must still report its broken link.
+        doc = yaml.load("""
+- skip: &shared
+    link: http://example.com/missing
+- steps: *shared
+""", Loader=SafeLoader)
+        self.assertIs(doc[0]["skip"], doc[1]["steps"])
+        with self.assertRaises(
+                schema_salad.validate.ValidationException) as cm:
+            ldr.validate_links(doc, u"")
+        self.assertEqual(
+            "While checking position 1\n"
+            "  While checking field `steps`\n"
+            "    Field `link` contains undefined reference to "
+            "`http://example.com/missing`", str(cm.exception))
+
 if __name__ == '__main__':
     unittest.main()